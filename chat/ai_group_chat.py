@@ -1,29 +1,38 @@
 import os
+import sys
 import asyncio
-import json
+import threading
+import orjson
 import base64
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable
 import time
-from dotenv import load_dotenv
+from dataclasses import dataclass, field
+from collections import deque, OrderedDict
+import aiofiles
 
-# Load environment variables from .env file
-load_dotenv()
+from clients import get_http_client, close_http_clients
 
-# For Gemini
-import google.generativeai as genai
-from google.generativeai import types as genai_types
+# Faster event loop where available (not on Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
-# For Llama (via Groq)
-from groq import Groq
+# Provider SDKs are imported by the agents that use them, so unused providers never load
 
-# Optional: For Claude (if you decide to add it)
-# import anthropic
+# Inputs that end the chat, compared against the stripped, lowercased input
+EXIT_COMMANDS = frozenset({"exit", "quit", "bye"})
 
+@dataclass(slots=True, frozen=True)
 class Message:
-    def __init__(self, sender: str, content: str, timestamp: Optional[float] = None):
-        self.sender = sender
-        self.content = content
-        self.timestamp = timestamp or time.time()
+    sender: str
+    content: str
+    timestamp: float = field(default_factory=time.time)
+    # The message as "sender: content", formatted once and shared by all agents
+    formatted: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "formatted", f"{self.sender}: {self.content}")
     
     def to_dict(self) -> Dict:
         return {
@@ -40,189 +49,398 @@ class Message:
             timestamp=data.get("timestamp", time.time())
         )
 
+class RateLimiter:
+    """Cap concurrent requests and requests per minute for a provider."""
+    def __init__(self, max_concurrent: int = 4, rpm_limit: int = 60, period: float = 60.0):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.rpm_limit = rpm_limit
+        self.period = period
+        self.timestamps: deque = deque()
+        self._lock = asyncio.Lock()
+    
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            await self._wait_for_slot()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+    
+    async def _wait_for_slot(self):
+        """Wait until a request fits in the sliding window, then record it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                # Drop requests that have left the window
+                while self.timestamps and now - self.timestamps[0] >= self.period:
+                    self.timestamps.popleft()
+                if len(self.timestamps) < self.rpm_limit:
+                    break
+                await asyncio.sleep(self.period - (now - self.timestamps[0]))
+            self.timestamps.append(now)
+
+class ResponseCache:
+    """LRU cache of agent responses keyed on the recent conversation."""
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+    
+    def get(self, key) -> Optional[str]:
+        content = self._entries.get(key)
+        if content is not None:
+            self._entries.move_to_end(key)
+        return content
+    
+    def set(self, key, content: str):
+        self._entries[key] = content
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+# Shared across agents; keys include the agent name and model
+response_cache = ResponseCache()
+
 class AIAgent:
-    def __init__(self, name: str):
+    # Shared by all agents of the same provider; subclasses override
+    _rate_limiter = RateLimiter()
+    
+    @classmethod
+    def set_rate_limit(cls, max_concurrent: int = 4, rpm_limit: int = 60):
+        """Configure the rate limit shared by all agents of this class."""
+        cls._rate_limiter = RateLimiter(max_concurrent=max_concurrent, rpm_limit=rpm_limit)
+    
+    def __init__(self, name: str, max_context: int = 10):
         self.name = name
-        self.context: List[Message] = []
+        self.max_context = max_context
+        self.context: deque = deque(maxlen=max_context)
+        # Provider-formatted context, only ever appended to between compactions
+        # so the request prefix stays stable for provider prompt caches
+        self._prefix_messages: List[Dict] = []
     
-    async def process_message(self, message: Message) -> Message:
-        """Process a message and return a response."""
+    async def process_message(self, message: Message, on_token: Optional[Callable[[str], None]] = None) -> Message:
+        """Process a message and return a response, passing text chunks to on_token as they arrive."""
         raise NotImplementedError("Subclasses must implement this method")
     
     def update_context(self, message: Message):
         """Add a message to the agent's context."""
         self.context.append(message)
+        self._prefix_messages.append(self.format_context_message(message))
+        
+        # Compact in blocks rather than sliding every turn; the prefix never exceeds max_context
+        if len(self._prefix_messages) > self.max_context:
+            keep = max(1, self.max_context // 2)
+            self._prefix_messages = self._prefix_messages[-keep:]
+    
+    def format_context_message(self, message: Message) -> Dict:
+        """Format a message in the provider's chat format."""
+        role = "user" if message.sender != self.name else "assistant"
+        return {"role": role, "content": message.formatted}
+    
+    def cache_key(self, message: Message, window: int = 4) -> tuple:
+        """Key a response on the system prompt and the last few messages."""
+        recent = list(self.context)[-window:]
+        if not recent or recent[-1] is not message:
+            recent = (recent + [message])[-window:]
+        return (
+            self.name,
+            getattr(self, "model", None),
+            getattr(self, "system_prompt", ""),
+            tuple((m.sender, " ".join(m.content.lower().split())) for m in recent)
+        )
+    
+    def build_messages(self, message: Message) -> List[Dict]:
+        """Return the stable context prefix followed by the new message."""
+        # The message is usually already the latest context entry
+        if self.context and self.context[-1] is message:
+            return list(self._prefix_messages)
+        return self._prefix_messages + [self.format_context_message(message)]
 
 class GeminiAgent(AIAgent):
-    def __init__(self, name: str = "Gemini", model: str = "gemini-2.5-pro-exp-03-25", system_prompt: str = ""):
-        super().__init__(name)
+    _rate_limiter = RateLimiter(max_concurrent=2, rpm_limit=5)
+    
+    def __init__(self, api_key: str, name: str = "Gemini", model: str = "gemini-2.5-pro-exp-03-25", system_prompt: str = "", max_context: int = 10):
+        super().__init__(name, max_context)
         # Initialize the Gemini client
-        api_key = os.environ.get("GEMINI_API_KEY")
         if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
+            raise ValueError("GEMINI_API_KEY not set")
         
         self.model = model
         self.system_prompt = system_prompt or "You are Gemini, an AI assistant in a group chat with other AI models and a human. Keep your responses concise and contribute meaningfully to the conversation."
         
         # Configure Gemini
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.client = genai.GenerativeModel(
             model_name=self.model,
+            system_instruction=self.system_prompt,
             generation_config={"temperature": 0.7}
         )
     
-    async def process_message(self, message: Message) -> Message:
-        # Prepare the conversation history for Gemini
-        contents = []
-        
-        # Add system prompt
-        contents.append({"role": "system", "parts": [{"text": self.system_prompt}]})
-        
-        # Add context messages
-        for ctx_msg in self.context[-10:]:  # Limit context to last 10 messages
-            role = "user" if ctx_msg.sender != self.name else "model"
-            contents.append({"role": role, "parts": [{"text": f"{ctx_msg.sender}: {ctx_msg.content}"}]})
+    def format_context_message(self, message: Message) -> Dict:
+        role = "user" if message.sender != self.name else "model"
+        return {"role": role, "parts": [{"text": message.formatted}]}
+    
+    async def process_message(self, message: Message, on_token: Optional[Callable[[str], None]] = None) -> Message:
+        # Reuse a previous response to the same conversation
+        key = self.cache_key(message)
+        cached = response_cache.get(key)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return Message(sender=self.name, content=cached)
         
-        # Add the new message
-        contents.append({"role": "user", "parts": [{"text": f"{message.sender}: {message.content}"}]})
+        # Prepare the conversation history for Gemini
+        contents = self.build_messages(message)
         
-        # Get response from Gemini
-        response = await asyncio.to_thread(
-            self.client.generate_content,
-            contents
-        )
+        # Stream the response from Gemini
+        chunks = []
+        async with self._rate_limiter:
+            response = await self.client.generate_content_async(contents, stream=True)
+            async for chunk in response:
+                text = chunk.text
+                if text:
+                    chunks.append(text)
+                    if on_token:
+                        on_token(text)
         
-        return Message(sender=self.name, content=response.text)
+        content = "".join(chunks)
+        response_cache.set(key, content)
+        return Message(sender=self.name, content=content)
 
 class LlamaAgent(AIAgent):
-    def __init__(self, name: str = "Llama", model: str = "llama-3.3-70b-versatile", system_prompt: str = ""):
-        super().__init__(name)
+    _rate_limiter = RateLimiter(max_concurrent=4, rpm_limit=30)
+    
+    def __init__(self, api_key: str, name: str = "Llama", model: str = "llama-3.3-70b-versatile", system_prompt: str = "", max_context: int = 10):
+        super().__init__(name, max_context)
         # Initialize the Groq client for Llama
-        api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
-            raise ValueError("GROQ_API_KEY environment variable not set")
-        self.client = Groq(api_key=api_key)
+            raise ValueError("GROQ_API_KEY not set")
+        import groq
+        self.client = groq.AsyncGroq(api_key=api_key, http_client=get_http_client("groq", groq))
         self.model = model
         self.system_prompt = system_prompt or "You are Llama, an AI assistant in a group chat with other AI models and a human. Keep your responses concise and contribute meaningfully to the conversation."
+        self._system_message = {"role": "system", "content": self.system_prompt}
     
-    async def process_message(self, message: Message) -> Message:
-        # Prepare the conversation history for Llama via Groq
-        messages = []
-        
-        # Add system prompt
-        messages.append({
-            "role": "system", 
-            "content": self.system_prompt
-        })
+    async def process_message(self, message: Message, on_token: Optional[Callable[[str], None]] = None) -> Message:
+        # Reuse a previous response to the same conversation
+        key = self.cache_key(message)
+        cached = response_cache.get(key)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return Message(sender=self.name, content=cached)
         
-        # Add context messages
-        for ctx_msg in self.context[-10:]:  # Limit context to last 10 messages
-            role = "user" if ctx_msg.sender != self.name else "assistant"
-            messages.append({"role": role, "content": f"{ctx_msg.sender}: {ctx_msg.content}"})
+        # Prepare the conversation history for Llama via Groq
+        messages = [self._system_message] + self.build_messages(message)
         
-        # Add the new message
-        messages.append({"role": "user", "content": f"{message.sender}: {message.content}"})
+        # Stream the response from Llama via Groq
+        chunks = []
+        async with self._rate_limiter:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1024,
+                stream=True
+            )
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    chunks.append(text)
+                    if on_token:
+                        on_token(text)
         
-        # Get response from Llama via Groq
-        completion = await asyncio.to_thread(
-            self.client.chat.completions.create,
-            model=self.model,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1024
-        )
-        
-        return Message(sender=self.name, content=completion.choices[0].message.content)
+        content = "".join(chunks)
+        response_cache.set(key, content)
+        return Message(sender=self.name, content=content)
 
 class ClaudeAgent(AIAgent):
-    def __init__(self, name: str = "Claude", model: str = "claude-3-5-sonnet", system_prompt: str = ""):
-        super().__init__(name)
-        api_key = os.environ.get("ANTHROPIC_API_KEY")
+    _rate_limiter = RateLimiter(max_concurrent=4, rpm_limit=50)
+    
+    def __init__(self, api_key: str, name: str = "Claude", model: str = "claude-3-5-sonnet", system_prompt: str = "", max_context: int = 10):
+        super().__init__(name, max_context)
         if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-        self.client = anthropic.Client(api_key=api_key)
+            raise ValueError("ANTHROPIC_API_KEY not set")
+        import anthropic
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, http_client=get_http_client("anthropic", anthropic))
         self.model = model
         self.system_prompt = system_prompt
-
-    async def process_message(self, message: Message) -> Message:
-        messages = []
         
-        # Add system prompt if provided
+        # Anthropic takes the system prompt separately; mark it cacheable
+        self._system = []
         if self.system_prompt:
-            messages.append({"role": "system", "content": self.system_prompt})
+            self._system.append({"type": "text", "text": self.system_prompt, "cache_control": {"type": "ephemeral"}})
+
+    async def process_message(self, message: Message, on_token: Optional[Callable[[str], None]] = None) -> Message:
+        # Reuse a previous response to the same conversation
+        key = self.cache_key(message)
+        cached = response_cache.get(key)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return Message(sender=self.name, content=cached)
         
-        # Add context messages
-        for ctx_msg in self.context[-10:]:
-            role = "user" if ctx_msg.sender != self.name else "assistant"
-            messages.append({"role": role, "content": f"{ctx_msg.sender}: {ctx_msg.content}"})
+        messages = self.build_messages(message)
         
-        # Add the new message
-        messages.append({"role": "user", "content": f"{message.sender}: {message.content}"})
+        # Mark the end of the committed context as a cache breakpoint
+        if self._prefix_messages:
+            last = self._prefix_messages[-1]
+            index = len(self._prefix_messages) - 1
+            messages[index] = {
+                "role": last["role"],
+                "content": [{"type": "text", "text": last["content"], "cache_control": {"type": "ephemeral"}}]
+            }
         
-        # Get response from Claude
-        completion = await asyncio.to_thread(
-            self.client.messages.create,
-            model=self.model,
-            messages=messages,
-            max_tokens=1024,
-            temperature=0.7
-        )
+        # Stream the response from Claude
+        chunks = []
+        async with self._rate_limiter:
+            async with self.client.messages.stream(
+                model=self.model,
+                system=self._system,
+                messages=messages,
+                max_tokens=1024,
+                temperature=0.7
+            ) as stream:
+                async for text in stream.text_stream:
+                    chunks.append(text)
+                    if on_token:
+                        on_token(text)
         
-        return Message(sender=self.name, content=completion.content)
+        content = "".join(chunks)
+        response_cache.set(key, content)
+        return Message(sender=self.name, content=content)
 
 class GPTAgent(AIAgent):
-    def __init__(self, name: str = "GPT", model: str = "gpt-4", system_prompt: str = ""):
-        super().__init__(name)
-        api_key = os.environ.get("OPENAI_API_KEY")
+    _rate_limiter = RateLimiter(max_concurrent=4, rpm_limit=60)
+    
+    def __init__(self, api_key: str, name: str = "GPT", model: str = "gpt-4", system_prompt: str = "", max_context: int = 10):
+        super().__init__(name, max_context)
         if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+            raise ValueError("OPENAI_API_KEY not set")
+        import openai
+        self.client = openai.AsyncOpenAI(api_key=api_key, http_client=get_http_client("openai", openai))
         self.model = model
         self.system_prompt = system_prompt
+        self._system_messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
 
-    async def process_message(self, message: Message) -> Message:
-        messages = []
+    async def process_message(self, message: Message, on_token: Optional[Callable[[str], None]] = None) -> Message:
+        # Reuse a previous response to the same conversation
+        key = self.cache_key(message)
+        cached = response_cache.get(key)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return Message(sender=self.name, content=cached)
         
-        # Add system prompt if provided
-        if self.system_prompt:
-            messages.append({"role": "system", "content": self.system_prompt})
+        messages = self._system_messages + self.build_messages(message)
         
-        # Add context messages
-        for ctx_msg in self.context[-10:]:
-            role = "user" if ctx_msg.sender != self.name else "assistant"
-            messages.append({"role": role, "content": f"{ctx_msg.sender}: {ctx_msg.content}"})
+        # Stream the response from GPT
+        chunks = []
+        async with self._rate_limiter:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=1024,
+                temperature=0.7,
+                stream=True
+            )
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    chunks.append(text)
+                    if on_token:
+                        on_token(text)
         
-        # Add the new message
-        messages.append({"role": "user", "content": f"{message.sender}: {message.content}"})
-        
-        # Get response from GPT
-        completion = await self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            max_tokens=1024,
-            temperature=0.7
-        )
-        
-        return Message(sender=self.name, content=completion.choices[0].message.content)
+        content = "".join(chunks)
+        response_cache.set(key, content)
+        return Message(sender=self.name, content=content)
 
 class HumanAgent(AIAgent):
     def __init__(self, name: str = "Human"):
         super().__init__(name)
     
-    async def process_message(self, message: Message) -> Message:
+    def update_context(self, message: Message):
+        # Humans never send a provider request, so skip building the formatted prefix
+        self.context.append(message)
+    
+    async def process_message(self, message: Message, on_token: Optional[Callable[[str], None]] = None) -> Message:
         # For a human agent, we just ask for input
         print(f"\n{message.sender}: {message.content}")
-        user_input = input(f"\n{self.name} (you): ")
+        user_input = await ainput(f"\n{self.name} (you): ")
         return Message(sender=self.name, content=user_input)
 
 class ChatSession:
-    def __init__(self):
+    def __init__(self, max_history: int = 100, history_file: str = "chat_history.jsonl",
+                 flush_interval: float = 2.0):
         self.agents: Dict[str, AIAgent] = {}
-        self.history: List[Message] = []
+        self.human_agent: Optional[HumanAgent] = None
+        self.ai_agents: List[AIAgent] = []
+        # Comma-separated agent names, rebuilt lazily after add_agent
+        self._participants: Optional[str] = None
+        # Called with each message added to the history (e.g. to refresh a UI)
+        self.listeners: List[Callable[[Message], None]] = []
+        self.history: deque = deque(maxlen=max_history)
+        self.history_file = history_file
+        self._history_fp = None
+        # Last message written by flush_history
+        self._last_saved: Optional[Message] = None
+        # New messages are written in batches every flush_interval seconds while the session is open
+        self.flush_interval = flush_interval
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+    
+    async def __aenter__(self) -> 'ChatSession':
+        await self.open_history()
+        self._flush_task = asyncio.create_task(self._periodic_flush())
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.close_history()
+        # Release the shared provider connection pools
+        await close_http_clients()
+    
+    async def open_history(self):
+        """Open the history file for appending."""
+        if self._history_fp is None:
+            self._history_fp = await aiofiles.open(self.history_file, "ab")
+    
+    async def _periodic_flush(self):
+        """Flush unsaved messages every flush_interval seconds."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so cancelling the task never abandons a half-finished write
+            await asyncio.shield(self.flush_history())
+    
+    async def close_history(self):
+        """Write any unsaved messages and close the history file."""
+        if self._history_fp is not None:
+            await self.flush_history()
+            await self._history_fp.close()
+            self._history_fp = None
     
     def add_agent(self, agent: AIAgent):
-        """Add an agent to the chat session."""
+        """Add an agent to the chat session, seeding its context from the history."""
         self.agents[agent.name] = agent
+        if isinstance(agent, HumanAgent):
+            self.human_agent = agent
+        self.ai_agents = [a for a in self.agents.values() if not isinstance(a, HumanAgent)]
+        self._participants = None
+        for message in list(self.history)[-agent.max_context:]:
+            agent.update_context(message)
+    
+    @property
+    def participants(self) -> str:
+        """Names of all agents in the session, joined once per change of membership."""
+        if self._participants is None:
+            self._participants = ", ".join(self.agents)
+        return self._participants
     
     def add_message(self, message: Message):
         """Add a message to the chat history and update agent contexts."""
@@ -230,82 +448,212 @@ class ChatSession:
         # Update context for all agents
         for agent in self.agents.values():
             agent.update_context(message)
+        for listener in self.listeners:
+            listener(message)
     
     async def run(self, initial_prompt: str):
         """Run the chat session."""
         # Add the initial message from the human
-        human_name = next((name for name, agent in self.agents.items() if isinstance(agent, HumanAgent)), "Human")
+        human_name = self.human_agent.name if self.human_agent else "Human"
         initial_message = Message(sender=human_name, content=initial_prompt)
         self.add_message(initial_message)
         
         print(f"\nWelcome to the AI Group Chat!")
-        print(f"Participants: {', '.join(self.agents.keys())}")
+        print(f"Participants: {self.participants}")
         print(f"\n{initial_message.sender}: {initial_message.content}")
         
         # Main chat loop
         try:
             while True:
-                # Each agent (except the human) responds to the last message
-                for name, agent in self.agents.items():
-                    # Skip the human agent for automatic responses
-                    if isinstance(agent, HumanAgent):
+                # Each agent (except the human) responds to the last message concurrently
+                names = [agent.name for agent in self.ai_agents]
+                last_message = self.history[-1]
+                
+                # Stream the agent being printed live; buffer the others until their turn
+                buffers: Dict[str, List[str]] = {name: [] for name in names}
+                printing = [None]
+                
+                def make_on_token(name: str) -> Callable[[str], None]:
+                    def on_token(token: str):
+                        buffers[name].append(token)
+                        if printing[0] == name:
+                            print(token, end="", flush=True)
+                    return on_token
+                
+                tasks = [
+                    asyncio.create_task(agent.process_message(last_message, on_token=make_on_token(agent.name)))
+                    for agent in self.ai_agents
+                ]
+                
+                # Print and add the responses in a stable order
+                for name, task in zip(names, tasks):
+                    printing[0] = name
+                    print(f"\n\n{name}: {''.join(buffers[name])}", end="", flush=True)
+                    try:
+                        response = await task
+                    except Exception as e:
+                        print(f"\nError getting response from {name}: {e}")
                         continue
+                    finally:
+                        printing[0] = None
                     
-                    # Get response from the agent
-                    response = await agent.process_message(self.history[-1])
                     self.add_message(response)
-                    
-                    # Print the response
-                    print(f"\n{response.sender}: {response.content}")
+                print()
                 
                 # Get input from the human
-                human_agent = next((agent for agent in self.agents.values() if isinstance(agent, HumanAgent)), None)
-                if human_agent:
-                    human_response = await human_agent.process_message(self.history[-1])
+                if self.human_agent:
+                    human_response = await self.human_agent.process_message(self.history[-1])
                     self.add_message(human_response)
                     
                     # Check if the user wants to exit
-                    if human_response.content.lower() in ["exit", "quit", "bye"]:
+                    if human_response.content.strip().lower() in EXIT_COMMANDS:
                         print("\nThank you for chatting with us! Goodbye.")
                         break
         
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # Ctrl-C arrives as a cancellation when running under asyncio.run
             print("\n\nChat session ended by user.")
             
         # Save chat history
-        self.save_history("chat_history.json")
+        await self.flush_history()
+        print(f"\nChat history saved to {self.history_file}")
     
-    def save_history(self, filename: str):
-        """Save the chat history to a file."""
-        with open(filename, "w") as f:
-            json.dump([msg.to_dict() for msg in self.history], f, indent=2)
-        print(f"\nChat history saved to {filename}")
+    def unsaved_messages(self) -> List[Message]:
+        """Return the messages added since the last save."""
+        unsaved = []
+        for message in reversed(self.history):
+            if message is self._last_saved:
+                break
+            unsaved.append(message)
+        unsaved.reverse()
+        return unsaved
+    
+    async def flush_history(self):
+        """Append messages added since the last flush to the JSON Lines history file."""
+        async with self._flush_lock:
+            unsaved = self.unsaved_messages()
+            if not unsaved:
+                return
+            await self.open_history()
+            await self._history_fp.write(b"".join(
+                orjson.dumps(msg.to_dict(), option=orjson.OPT_APPEND_NEWLINE) for msg in unsaved
+            ))
+            await self._history_fp.flush()
+            self._last_saved = unsaved[-1]
     
     @classmethod
-    def from_history(cls, filename: str) -> 'ChatSession':
-        """Load a chat session from a history file."""
-        session = cls()
+    def from_history(cls, filename: str, max_history: int = 100, flush_interval: float = 2.0) -> 'ChatSession':
+        """Load a chat session from a JSON Lines (or legacy JSON array) history file."""
+        session = cls(max_history=max_history, history_file=filename, flush_interval=flush_interval)
+        legacy = False
         try:
-            with open(filename, "r") as f:
-                history_data = json.load(f)
+            with open(filename, "rb") as f:
+                legacy = f.read(1) == b"["
+                f.seek(0)
+                if legacy:
+                    history_data = orjson.loads(f.read())
+                else:
+                    history_data = (orjson.loads(line) for line in f if line.strip())
                 for msg_data in history_data:
                     session.history.append(Message.from_dict(msg_data))
         except FileNotFoundError:
             pass
+        
+        if legacy:
+            # Migrate legacy files to a JSON Lines file alongside them
+            session.history_file = os.path.splitext(filename)[0] + ".jsonl"
+        elif session.history:
+            # Loaded messages are already on disk
+            session._last_saved = session.history[-1]
         return session
 
+# Bytes read from stdin by ainput but not yet returned as a line
+_stdin_pending = bytearray()
+
+def _pop_stdin_line(eof: bool = False) -> Optional[str]:
+    """Return the next complete line from the stdin buffer (or the remainder at EOF)."""
+    end = _stdin_pending.find(b"\n")
+    if end == -1:
+        if not (eof and _stdin_pending):
+            return None
+        end = len(_stdin_pending) - 1
+    line = bytes(_stdin_pending[:end + 1])
+    del _stdin_pending[:end + 1]
+    return line.decode(sys.stdin.encoding or "utf-8", errors="replace").rstrip("\r\n")
+
+async def ainput(prompt: str = "") -> str:
+    """Read a line from stdin without blocking the event loop.
+    
+    Unlike asyncio.to_thread(input), a pending read never keeps the process alive
+    after Ctrl-C: stdin is read from its raw fd via add_reader where the loop supports
+    it, and otherwise on a daemon thread.
+    """
+    print(prompt, end="", flush=True)
+    loop = asyncio.get_running_loop()
+    
+    # Several lines can arrive in one read (a paste or piped input)
+    line = _pop_stdin_line()
+    if line is not None:
+        return line
+    
+    future = loop.create_future()
+    
+    def resolve(line: Optional[str]):
+        if future.done():
+            return
+        if line is None:
+            future.set_exception(EOFError())
+        else:
+            future.set_result(line)
+    
+    def on_readable():
+        data = os.read(fd, 4096)
+        if data:
+            _stdin_pending.extend(data)
+            line = _pop_stdin_line()
+            if line is not None:
+                resolve(line)
+        else:
+            resolve(_pop_stdin_line(eof=True))
+    
+    try:
+        fd = sys.stdin.fileno()
+        loop.add_reader(fd, on_readable)
+    except (NotImplementedError, OSError, ValueError):
+        def read():
+            line = sys.stdin.readline()
+            try:
+                loop.call_soon_threadsafe(resolve, line.rstrip("\n") if line else None)
+            except RuntimeError:
+                pass  # The loop closed while we were waiting
+        threading.Thread(target=read, daemon=True).start()
+        return await future
+    
+    try:
+        return await future
+    finally:
+        loop.remove_reader(fd)
+
+def run_event_loop(coro):
+    """Run a coroutine on uvloop if it is installed, otherwise on the default asyncio loop."""
+    if uvloop is not None:
+        return uvloop.run(coro)
+    return asyncio.run(coro)
+
 async def main():
     # Create a chat session
     session = ChatSession()
     
     # Add agents
-    session.add_agent(GeminiAgent())
-    session.add_agent(LlamaAgent())
+    from config import API_KEYS
+    session.add_agent(GeminiAgent(api_key=API_KEYS["GEMINI_API_KEY"]))
+    session.add_agent(LlamaAgent(api_key=API_KEYS["GROQ_API_KEY"]))
     session.add_agent(HumanAgent())
     
     # Start the chat
-    initial_prompt = input("Enter an initial topic or question to start the chat: ")
-    await session.run(initial_prompt)
+    initial_prompt = await ainput("Enter an initial topic or question to start the chat: ")
+    async with session:
+        await session.run(initial_prompt)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run_event_loop(main())
\ No newline at end of file
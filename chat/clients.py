@@ -0,0 +1,36 @@
+# clients.py
+import threading
+import httpx
+from types import ModuleType
+from typing import Dict, Optional
+
+# Connection pool limits shared by every agent of a provider
+HTTP_LIMITS = {"max_connections": 100, "max_keepalive_connections": 50}
+
+_http_clients: Dict[str, httpx.AsyncClient] = {}
+# Agents are constructed on worker threads, so pool creation must not race
+_http_clients_lock = threading.Lock()
+
+def get_http_client(provider: str, sdk: Optional[ModuleType] = None) -> httpx.AsyncClient:
+    """Return the shared keep-alive HTTP client for a provider, creating it on first use.
+
+    SDKs that ship their own httpx client class (possibly built on a fork such as httpx2)
+    only accept instances of it, so the pool is built from ``sdk`` when one is given.
+    """
+    with _http_clients_lock:
+        client = _http_clients.get(provider)
+        if client is None or client.is_closed:
+            client_class = getattr(sdk, "DefaultAsyncHttpxClient", httpx.AsyncClient)
+            # Limits must come from the same httpx package as the client
+            limits_class = type(getattr(sdk, "DEFAULT_CONNECTION_LIMITS", httpx.Limits()))
+            client = client_class(http2=True, limits=limits_class(**HTTP_LIMITS))
+            _http_clients[provider] = client
+        return client
+
+async def close_http_clients():
+    """Close all shared HTTP clients."""
+    with _http_clients_lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+    for client in clients:
+        await client.aclose()
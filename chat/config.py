@@ -45,6 +45,14 @@ AGENTS = [
     }
 ]
 
+# Rate Limits per provider (shared by all agents of the same type)
+RATE_LIMITS = {
+    "gemini": {"max_concurrent": 2, "rpm_limit": 5},
+    "llama": {"max_concurrent": 4, "rpm_limit": 30},
+    "anthropic": {"max_concurrent": 4, "rpm_limit": 50},
+    "openai": {"max_concurrent": 4, "rpm_limit": 60}
+}
+
 # UI Configuration
 UI_CONFIG = {
     "colors": {
@@ -62,6 +70,7 @@ UI_CONFIG = {
 
 # Chat Session Configuration
 SESSION_CONFIG = {
-    "history_file": "chat_history.json",
+    "history_file": "chat_history.jsonl",
+    "flush_interval": 2.0,  # Seconds between batched history writes
     "log_level": "INFO"  # DEBUG, INFO, WARNING, ERROR
 }
\ No newline at end of file
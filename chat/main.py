@@ -14,7 +14,7 @@ Options:
     --load HISTORY_FILE     Load a previous chat history
 
 Requirements:
-    - Python 3.8+
+    - Python 3.10+
     - API keys for the AI services you want to use
     - Required packages: pip install -r requirements.txt
 """
@@ -27,22 +27,6 @@ import importlib.util
 import logging
 import json
 from typing import Dict, List, Optional, Type
-from dotenv import load_dotenv
-
-# Import curses
-try:
-    import curses
-    import curses.ascii
-except ImportError:
-    if sys.platform == 'win32':
-        print("On Windows, you need to install windows-curses:")
-        print("pip install windows-curses")
-    else:
-        print("Curses library not found")
-    sys.exit(1)
-
-# Load environment variables from .env file
-load_dotenv()
 
 # Import the base classes
 from ai_group_chat import (
@@ -53,33 +37,23 @@ from ai_group_chat import (
     LlamaAgent,
     ClaudeAgent,
     GPTAgent,
+    run_event_loop,
+    ainput,
 )
-from terminal_ui import TerminalUI, HumanAgent
-
-# Try to import optional AI client libraries
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-
-try:
-    from groq import Groq
-    LLAMA_AVAILABLE = True
-except ImportError:
-    LLAMA_AVAILABLE = False
-
-try:
-    import anthropic
-    CLAUDE_AVAILABLE = True
-except ImportError:
-    CLAUDE_AVAILABLE = False
-
-try:
-    import openai
-    GPT_AVAILABLE = True
-except ImportError:
-    GPT_AVAILABLE = False
+from ai_group_chat import HumanAgent as ConsoleHumanAgent
+
+# Check for optional AI client libraries without importing them
+def module_available(name: str) -> bool:
+    """Return True if a module can be imported."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        return False
+
+GEMINI_AVAILABLE = module_available("google.generativeai")
+LLAMA_AVAILABLE = module_available("groq")
+CLAUDE_AVAILABLE = module_available("anthropic")
+GPT_AVAILABLE = module_available("openai")
 
 # Configure logging
 logging.basicConfig(
@@ -93,6 +67,14 @@ logging.basicConfig(
 
 logger = logging.getLogger("ai_group_chat")
 
+# Agent classes by config type
+AGENT_TYPES = {
+    "gemini": GeminiAgent,
+    "llama": LlamaAgent,
+    "anthropic": ClaudeAgent,
+    "openai": GPTAgent,
+}
+
 def load_config(config_path: str = "config.py") -> Dict:
     """Load configuration from a Python file."""
     try:
@@ -104,6 +86,7 @@ def load_config(config_path: str = "config.py") -> Dict:
         config_data = {
             "API_KEYS": getattr(config, "API_KEYS", {}),
             "AGENTS": getattr(config, "AGENTS", []),
+            "RATE_LIMITS": getattr(config, "RATE_LIMITS", {}),
             "UI_CONFIG": getattr(config, "UI_CONFIG", {}),
             "SESSION_CONFIG": getattr(config, "SESSION_CONFIG", {})
         }
@@ -114,11 +97,21 @@ def load_config(config_path: str = "config.py") -> Dict:
         return {
             "API_KEYS": {},
             "AGENTS": [],
+            "RATE_LIMITS": {},
             "UI_CONFIG": {},
             "SESSION_CONFIG": {}
         }
 
-def create_agent(agent_config: Dict, api_keys: Dict) -> Optional[AIAgent]:
+def create_agent(agent_config: Dict, api_keys: Dict, max_context: int = 10) -> Optional[AIAgent]:
+    """Create an AI agent based on the configuration, or None if it cannot be created."""
+    try:
+        return _create_agent(agent_config, api_keys, max_context)
+    except Exception as e:
+        # One misconfigured provider should not stop the others from joining
+        logger.error(f"Failed to create agent {agent_config.get('name', agent_config.get('type', ''))}: {e}")
+        return None
+
+def _create_agent(agent_config: Dict, api_keys: Dict, max_context: int = 10) -> Optional[AIAgent]:
     """Create an AI agent based on the configuration."""
     agent_type = agent_config.get("type", "").lower()
     agent_name = agent_config.get("name", agent_type.capitalize())
@@ -138,12 +131,12 @@ def create_agent(agent_config: Dict, api_keys: Dict) -> Optional[AIAgent]:
             logger.warning(f"GEMINI_API_KEY not found. Skipping {agent_name}")
             return None
         
-        # Configure Gemini
-        genai.configure(api_key=api_key)
         return GeminiAgent(
+            api_key=api_key,
             name=agent_name,
             model=agent_config.get("model", "gemini-2.5-pro-exp-03-25"),
-            system_prompt=agent_config.get("system_prompt", "")
+            system_prompt=agent_config.get("system_prompt", ""),
+            max_context=max_context
         )
     
     elif agent_type == "llama":
@@ -157,9 +150,11 @@ def create_agent(agent_config: Dict, api_keys: Dict) -> Optional[AIAgent]:
             return None
         
         return LlamaAgent(
+            api_key=api_key,
             name=agent_name,
             model=agent_config.get("model", "llama-3.3-70b-versatile"),
-            system_prompt=agent_config.get("system_prompt", "")
+            system_prompt=agent_config.get("system_prompt", ""),
+            max_context=max_context
         )
     
     elif agent_type == "anthropic":
@@ -173,9 +168,11 @@ def create_agent(agent_config: Dict, api_keys: Dict) -> Optional[AIAgent]:
             return None
             
         return ClaudeAgent(
+            api_key=api_key,
             name=agent_name,
             model=agent_config.get("model", "claude-3-5-sonnet"),
-            system_prompt=agent_config.get("system_prompt", "")
+            system_prompt=agent_config.get("system_prompt", ""),
+            max_context=max_context
         )
     
     elif agent_type == "openai":
@@ -189,9 +186,11 @@ def create_agent(agent_config: Dict, api_keys: Dict) -> Optional[AIAgent]:
             return None
             
         return GPTAgent(
+            api_key=api_key,
             name=agent_name,
             model=agent_config.get("model", "gpt-4"),
-            system_prompt=agent_config.get("system_prompt", "")
+            system_prompt=agent_config.get("system_prompt", ""),
+            max_context=max_context
         )
     
     logger.warning(f"Unknown agent type: {agent_type}")
@@ -205,45 +204,67 @@ async def main():
     parser.add_argument("--load", help="Load chat history from file")
     args = parser.parse_args()
 
-    try:
-        # Initialize curses for color support check
-        curses.initscr()
-        curses.start_color()
-        curses.endwin()
-    except Exception as e:
-        logger.error(f"Failed to initialize curses: {e}")
-        if not args.no_ui:
-            print("Terminal does not support required features. Use --no-ui to run in console mode.")
+    # The terminal UI needs curses; console mode runs without it
+    if not args.no_ui:
+        try:
+            from terminal_ui import TerminalUI, HumanAgent, TerminalUnsupported, curses_wrapper
+        except ImportError:
+            if sys.platform == 'win32':
+                print("On Windows, you need to install windows-curses:")
+                print("pip install windows-curses")
+            else:
+                print("Curses library not found")
+            print("Use --no-ui to run in console mode.")
             sys.exit(1)
 
     # Load configuration
     config = load_config(args.config)
     
+    # Apply per-provider rate limits
+    for agent_type, limits in config["RATE_LIMITS"].items():
+        agent_class = AGENT_TYPES.get(agent_type.lower())
+        if agent_class:
+            agent_class.set_rate_limit(**limits)
+    
     # Create chat session
+    max_history = config["UI_CONFIG"].get("max_history", 100)
+    max_context = config["UI_CONFIG"].get("max_context", 10)
+    flush_interval = config["SESSION_CONFIG"].get("flush_interval", 2.0)
     if args.load:
-        session = ChatSession.from_history(args.load)
+        session = ChatSession.from_history(args.load, max_history=max_history, flush_interval=flush_interval)
     else:
-        session = ChatSession()
+        history_file = config["SESSION_CONFIG"].get("history_file", "chat_history.jsonl")
+        session = ChatSession(max_history=max_history, history_file=history_file,
+                              flush_interval=flush_interval)
 
-    # Create and add agents based on configuration
-    for agent_config in config["AGENTS"]:
-        agent = create_agent(agent_config, config["API_KEYS"])
+    # Create agents based on configuration, constructing provider clients concurrently
+    agents = await asyncio.gather(*(
+        asyncio.to_thread(create_agent, agent_config, config["API_KEYS"], max_context)
+        for agent_config in config["AGENTS"]
+    ))
+    for agent in agents:
         if agent:
             session.add_agent(agent)
 
     # Add human agent
-    human = HumanAgent()
+    human = ConsoleHumanAgent() if args.no_ui else HumanAgent()
     session.add_agent(human)
 
-    if args.no_ui:
-        # Run in console mode
-        initial_prompt = input("Enter an initial topic or question to start the chat: ")
-        await session.run(initial_prompt)
-    else:
-        # Run with terminal UI
-        ui = TerminalUI(session)
-        human.set_ui(ui)
-        await curses.wrapper(ui.run)
+    async with session:
+        if args.no_ui:
+            # Run in console mode
+            initial_prompt = await ainput("Enter an initial topic or question to start the chat: ")
+            await session.run(initial_prompt)
+        else:
+            # Run with terminal UI
+            ui = TerminalUI(session)
+            human.set_ui(ui)
+            try:
+                await curses_wrapper(ui.run)
+            except TerminalUnsupported as e:
+                logger.error(f"Failed to initialize curses: {e}")
+                print("Terminal does not support required features. Use --no-ui to run in console mode.")
+                sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run_event_loop(main())
\ No newline at end of file
@@ -1,16 +1,32 @@
 import os
+import sys
 import asyncio
 import curses
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import time
+import itertools
+import functools
+import textwrap
+from collections import deque
+from typing import List, Dict, Optional, Tuple, Callable
 
 # Import the classes from our main module
-from ai_group_chat import Message, AIAgent, GeminiAgent, LlamaAgent, ChatSession
+from ai_group_chat import Message, GeminiAgent, LlamaAgent, ChatSession, run_event_loop, EXIT_COMMANDS
+from ai_group_chat import HumanAgent as ConsoleHumanAgent, ainput
+
+class TerminalUnsupported(RuntimeError):
+    """Raised when the terminal cannot run the curses UI."""
+
+@functools.lru_cache(maxsize=1024)
+def format_message(message: Message) -> str:
+    """Format a message for display, memoized per (immutable) message."""
+    timestamp = time.strftime("%H:%M:%S", time.localtime(message.timestamp))
+    return f"[{timestamp}] {message.sender}: {message.content}"
 
 class TerminalUI:
     def __init__(self, session: ChatSession):
         self.session = session
-        self.input_buffer = ""
+        # Edited in place; joined into a string only when displayed or submitted
+        self.input_buffer: List[str] = []
         self.cursor_position = 0
         self.scroll_position = 0
         self.stdscr = None
@@ -19,6 +35,33 @@ class TerminalUI:
         self.input_height = 3
         self.status_height = 2
         
+        # Redraws are coalesced to at most one per frame interval
+        self.frame_interval = 0.016
+        self._dirty = asyncio.Event()
+        self._dirty.set()
+        self._last_draw = 0.0
+        self.session.listeners.append(self._on_message)
+        
+        # Lines submitted with Enter, filled by the stdin reader
+        self._submitted: asyncio.Queue = asyncio.Queue()
+        
+        # Windows are created once by create_windows; the caches let unchanged windows skip drawing
+        self._chat_win = None
+        self._input_win = None
+        self._status_win = None
+        self._last_history_state = None
+        self._last_input_state = None
+        self._last_participants = None
+        
+        # Wrapped (line, attribute) pairs for the most recent messages, appended as messages arrive
+        self._wrapped: deque = deque()
+        self._wrapped_last: Optional[Message] = None
+        # Reused for every message; rebuilt by create_windows when the width changes
+        self._wrapper: Optional[textwrap.TextWrapper] = None
+        
+        # Name of the agent currently generating a reply, shown below the history
+        self._thinking: Optional[str] = None
+        
         # Colors for different agents
         self.colors = {
             "Human": 1,
@@ -26,6 +69,8 @@ class TerminalUI:
             "Llama": 3,
             "System": 4
         }
+        # Curses attributes for each sender, built by setup_colors
+        self._attr: Dict[str, int] = {}
     
     def setup_colors(self):
         """Setup color pairs for the UI."""
@@ -37,94 +82,206 @@ class TerminalUI:
         curses.init_pair(2, curses.COLOR_GREEN, -1)  # Gemini: green on default
         curses.init_pair(3, curses.COLOR_BLUE, -1)   # Llama: blue on default
         curses.init_pair(4, curses.COLOR_YELLOW, -1) # System: yellow on default
+        
+        # Look up each sender's attribute once instead of per drawn line
+        self._attr = {name: curses.color_pair(pair) for name, pair in self.colors.items()}
     
     def format_message(self, message: Message) -> str:
         """Format a message for display."""
-        timestamp = datetime.fromtimestamp(message.timestamp).strftime("%H:%M:%S")
-        return f"[{timestamp}] {message.sender}: {message.content}"
+        return format_message(message)
+    
+    def create_windows(self):
+        """Create the chat, input and status windows for the current screen size."""
+        self.max_y, self.max_x = self.stdscr.getmaxyx()
+        chat_height = self.max_y - self.input_height - self.status_height
+        self._chat_win = curses.newwin(chat_height, self.max_x, 0, 0)
+        self._input_win = curses.newwin(self.input_height, self.max_x, chat_height, 0)
+        self._status_win = curses.newwin(self.status_height, self.max_x, self.max_y - self.status_height, 0)
+        
+        # Rewrap for the new width and force every window to redraw
+        # One column short of the edge: writing the bottom-right cell is a curses error
+        self._wrapper = textwrap.TextWrapper(
+            width=max(1, self.max_x - 1),
+            drop_whitespace=False,
+            replace_whitespace=False,
+            break_on_hyphens=False
+        )
+        self._wrapped = deque(maxlen=4 * self.max_y)
+        self._wrapped_last = None
+        self._last_history_state = None
+        self._last_input_state = None
+        self._last_participants = None
+        self._dirty.set()
+    
+    def wrap_message(self, message: Message) -> List[Tuple[str, int]]:
+        """Split a formatted message into (line, attribute) pairs, one per screen row."""
+        attr = self._attr.get(message.sender, 0)
+        lines = []
+        # Wrap each line of the message separately so no row contains a newline
+        for text in self.format_message(message).splitlines():
+            lines.extend(self._wrapper.wrap(text) or [""])
+        return [(line, attr) for line in lines]
+    
+    def _sync_wrapped_lines(self):
+        """Wrap messages added since the last draw, rebuilding if history changed otherwise."""
+        history = self.session.history
+        # Collected newest-first with appendleft so they come out in display order
+        pending: deque = deque()
+        lines = 0
+        found = False
+        for message in reversed(history):
+            if message is self._wrapped_last:
+                found = True
+                break
+            wrapped = self.wrap_message(message)
+            pending.appendleft(wrapped)
+            lines += len(wrapped)
+            if lines >= self._wrapped.maxlen:
+                break
+        
+        # The last wrapped message was removed or scrolled out; start over from the tail
+        if not found:
+            self._wrapped.clear()
+        for wrapped in pending:
+            self._wrapped.extend(wrapped)
+        self._wrapped_last = history[-1] if history else None
     
     def draw_messages(self):
         """Draw the message history in the chat window."""
+        history = self.session.history
+        history_state = (len(history), id(history[-1]) if history else None, self._thinking)
+        if history_state == self._last_history_state:
+            return
+        self._last_history_state = history_state
+        
         # Calculate chat window dimensions
         chat_height = self.max_y - self.input_height - self.status_height
-        chat_width = self.max_x
         
-        # Create a chat window
-        chat_win = curses.newwin(chat_height, chat_width, 0, 0)
-        chat_win.clear()
+        chat_win = self._chat_win
+        chat_win.erase()
         
-        # Display messages
+        # Display the last lines that fit, leaving a row for the thinking indicator
+        self._sync_wrapped_lines()
+        visible_height = chat_height - 1 if self._thinking else chat_height
+        start = max(0, len(self._wrapped) - visible_height)
         y_pos = 0
-        messages_to_show = []
-        lines_needed = 0
-        
-        # Calculate how many messages we can show
-        for message in reversed(self.session.history):
-            formatted = self.format_message(message)
-            msg_lines = len([formatted[i:i+chat_width] for i in range(0, len(formatted), chat_width)])
-            if lines_needed + msg_lines > chat_height:
-                break
-            messages_to_show.insert(0, (message, msg_lines))
-            lines_needed += msg_lines
+        for y_pos, (line, attr) in enumerate(itertools.islice(self._wrapped, start, None), 1):
+            chat_win.addstr(y_pos - 1, 0, line, attr)
         
-        # Display the messages
-        for message, lines in messages_to_show:
-            color = self.colors.get(message.sender, 0)
-            formatted = self.format_message(message)
-            
-            # Split message into lines that fit the window width
-            lines_to_print = [formatted[i:i+chat_width] for i in range(0, len(formatted), chat_width)]
-            
-            for line in lines_to_print:
-                chat_win.addstr(y_pos, 0, line, curses.color_pair(color))
-                y_pos += 1
+        # Transient state is drawn over the history rather than stored in it
+        if self._thinking:
+            indicator = f"[..] {self._thinking} is thinking..."[:self.max_x - 1]
+            chat_win.addstr(y_pos, 0, indicator, self._attr.get("System", 0) | curses.A_DIM)
         
-        chat_win.refresh()
+        chat_win.noutrefresh()
+    
+    def _on_message(self, message: Message):
+        """Mark the screen for redraw when a message is added."""
+        self._dirty.set()
+    
+    def redraw(self):
+        """Redraw all windows in a single terminal update and clear the dirty flag."""
+        self.draw_messages()
+        self.draw_status_bar()
+        # Drawn last so the terminal cursor ends up in the input box
+        self.draw_input_box()
+        curses.doupdate()
+        self._dirty.clear()
+        self._last_draw = time.monotonic()
+    
+    async def _redraw_loop(self):
+        """Redraw when the screen is marked dirty, at most once per frame interval."""
+        while True:
+            await self._dirty.wait()
+            # Draw immediately after an idle period; otherwise wait out the frame
+            delay = self.frame_interval - (time.monotonic() - self._last_draw)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                self.redraw()
+            except curses.error:
+                # Drop the failed frame (e.g. a write past the edge mid-resize) and redraw
+                # every window from scratch on the next change instead of stopping the loop
+                self._last_history_state = None
+                self._last_input_state = None
+                self._last_participants = None
+                self._dirty.clear()
+                self._last_draw = time.monotonic()
+    
+    def _drain_input(self):
+        """Handle every key waiting on stdin, queueing any submitted line."""
+        key = self.stdscr.getch()
+        while key != -1:
+            result = self.handle_input(key)
+            if result is not None:
+                self._submitted.put_nowait(result)
+                self.input_buffer = []
+                self.cursor_position = 0
+            key = self.stdscr.getch()
+    
+    async def _poll_input(self):
+        """Fallback for event loops without add_reader support (e.g. the Windows proactor loop)."""
+        while True:
+            self._drain_input()
+            await asyncio.sleep(self.frame_interval)
     
     def draw_input_box(self):
         """Draw the input box at the bottom of the screen."""
-        input_win = curses.newwin(self.input_height, self.max_x, self.max_y - self.input_height - self.status_height, 0)
-        input_win.clear()
-        
-        # Draw a box around the input area
-        input_win.box()
-        
-        # Show the current input
-        input_win.addstr(1, 2, self.input_buffer[:self.max_x-4])
-        
-        # Position the cursor
-        cursor_x = min(2 + self.cursor_position, self.max_x - 3)
-        input_win.move(1, cursor_x)
+        input_win = self._input_win
+        text = "".join(self.input_buffer[:self.max_x-4])
+        input_state = (text, self.cursor_position)
+        if input_state != self._last_input_state:
+            self._last_input_state = input_state
+            input_win.erase()
+            
+            # Draw a box around the input area
+            input_win.box()
+            
+            # Show the current input
+            input_win.addstr(1, 2, text)
+            
+            # Position the cursor
+            cursor_x = min(2 + self.cursor_position, self.max_x - 3)
+            input_win.move(1, cursor_x)
         
-        input_win.refresh()
+        # Always queued so the cursor is restored even when nothing changed
+        input_win.noutrefresh()
     
     def draw_status_bar(self):
         """Draw the status bar at the bottom of the screen."""
-        status_win = curses.newwin(self.status_height, self.max_x, self.max_y - self.status_height, 0)
-        status_win.clear()
+        # The session caches the joined names, so an unchanged status bar costs one identity check
+        participants = self.session.participants
+        if participants is self._last_participants:
+            return
+        self._last_participants = participants
+        
+        status_win = self._status_win
+        status_win.erase()
         
         # Draw a horizontal line to separate from input
         status_win.hline(0, 0, curses.ACS_HLINE, self.max_x)
         
         # Display participants
-        participants = f"Participants: {', '.join(self.session.agents.keys())}"
-        status_win.addstr(1, 2, participants[:self.max_x-4])
+        status_win.addstr(1, 2, f"Participants: {participants}"[:self.max_x-4])
         
-        status_win.refresh()
+        status_win.noutrefresh()
     
     def handle_input(self, key):
         """Handle keyboard input."""
-        if key == curses.KEY_ENTER or key == 10 or key == 13:  # Enter key
+        self._dirty.set()
+        if key == curses.KEY_RESIZE:  # Terminal resized
+            self.create_windows()
+        elif key == curses.KEY_ENTER or key == 10 or key == 13:  # Enter key
             if self.input_buffer:
-                return self.input_buffer
+                return "".join(self.input_buffer)
             return None
         elif key == curses.KEY_BACKSPACE or key == 127:  # Backspace
             if self.cursor_position > 0:
-                self.input_buffer = self.input_buffer[:self.cursor_position-1] + self.input_buffer[self.cursor_position:]
+                del self.input_buffer[self.cursor_position-1]
                 self.cursor_position -= 1
         elif key == curses.KEY_DC:  # Delete key
             if self.cursor_position < len(self.input_buffer):
-                self.input_buffer = self.input_buffer[:self.cursor_position] + self.input_buffer[self.cursor_position+1:]
+                del self.input_buffer[self.cursor_position]
         elif key == curses.KEY_LEFT:  # Left arrow
             self.cursor_position = max(0, self.cursor_position - 1)
         elif key == curses.KEY_RIGHT:  # Right arrow
@@ -134,37 +291,20 @@ class TerminalUI:
         elif key == curses.KEY_END:  # End
             self.cursor_position = len(self.input_buffer)
         elif 32 <= key <= 126:  # Printable characters
-            char = chr(key)
-            self.input_buffer = self.input_buffer[:self.cursor_position] + char + self.input_buffer[self.cursor_position:]
+            self.input_buffer.insert(self.cursor_position, chr(key))
             self.cursor_position += 1
         
         return None
     
     async def get_user_input(self) -> str:
-        """Get user input and handle UI updates."""
-        self.input_buffer = ""
-        self.cursor_position = 0
-        
-        while True:
-            # Update the UI
-            self.draw_messages()
-            self.draw_input_box()
-            self.draw_status_bar()
-            
-            # Get a key
-            try:
-                key = self.stdscr.getch()
-            except curses.error:
-                await asyncio.sleep(0.1)
-                continue
-            
-            # Handle key input
-            result = self.handle_input(key)
-            if result is not None:
-                return result
+        """Wait for the next line the user submits."""
+        return await self._submitted.get()
     
     async def run(self, stdscr):
         """Run the UI loop."""
+        if not curses.has_colors():
+            raise TerminalUnsupported("Terminal does not support colors")
+        
         self.stdscr = stdscr
         self.stdscr.clear()
         
@@ -172,12 +312,14 @@ class TerminalUI:
         curses.curs_set(1)
         curses.noecho()
         self.stdscr.keypad(1)
+        self.stdscr.nodelay(True)
         
         # Setup colors
         self.setup_colors()
         
-        # Get screen dimensions
-        self.max_y, self.max_x = self.stdscr.getmaxyx()
+        # Create the windows for the current screen size
+        self.stdscr.refresh()
+        self.create_windows()
         
         # Add a welcome message
         welcome_message = Message(
@@ -186,47 +328,57 @@ class TerminalUI:
         )
         self.session.add_message(welcome_message)
         
-        # Main UI loop
+        # Read keys as stdin becomes readable instead of polling
+        loop = asyncio.get_running_loop()
+        stdin_fd = sys.stdin.fileno()
+        poll_task = None
+        try:
+            loop.add_reader(stdin_fd, self._drain_input)
+        except NotImplementedError:
+            poll_task = asyncio.create_task(self._poll_input())
+        
+        # Main UI loop; if drawing fails for any other reason, stop it and re-raise below
+        redraw_task = asyncio.create_task(self._redraw_loop())
+        main_task = asyncio.current_task()
+        
+        def on_redraw_done(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                main_task.cancel()
+        
+        redraw_task.add_done_callback(on_redraw_done)
         try:
             while True:
                 # Get a message from the user
                 user_input = await self.get_user_input()
                 
-                if user_input.lower() in ["exit", "quit", "bye"]:
+                if user_input.strip().lower() in EXIT_COMMANDS:
                     # Add a goodbye message
                     goodbye_message = Message(
                         sender="System",
                         content="Thank you for chatting with us! Goodbye."
                     )
                     self.session.add_message(goodbye_message)
-                    self.draw_messages()
                     await asyncio.sleep(2)
                     break
                 
                 # Add the user's message
-                human_name = next((name for name, agent in self.session.agents.items() 
-                                 if isinstance(agent, HumanAgent)), "Human")
+                human_agent = self.session.human_agent
+                human_name = human_agent.name if human_agent else "Human"
                 user_message = Message(sender=human_name, content=user_input)
                 self.session.add_message(user_message)
                 
                 # Let each AI agent respond
-                for name, agent in self.session.agents.items():
-                    if isinstance(agent, HumanAgent):
-                        continue
+                for agent in self.session.ai_agents:
+                    name = agent.name
                     
                     # Update UI to show "thinking" state
-                    thinking_message = Message(
-                        sender="System",
-                        content=f"{name} is thinking..."
-                    )
-                    self.session.add_message(thinking_message)
-                    self.draw_messages()
+                    self._thinking = name
+                    self._dirty.set()
                     
                     # Get response from the agent
                     try:
-                        response = await agent.process_message(self.session.history[-2])  # Get response to the user message
-                        # Remove the thinking message
-                        self.session.history.pop()
+                        response = await agent.process_message(self.session.history[-1])  # Get response to the latest message
+                        self._thinking = None
                         # Add the real response
                         self.session.add_message(response)
                     except Exception as e:
@@ -235,22 +387,52 @@ class TerminalUI:
                             sender="System",
                             content=f"Error getting response from {name}: {str(e)}"
                         )
-                        # Remove the thinking message
-                        self.session.history.pop()
+                        self._thinking = None
                         # Add the error message
                         self.session.add_message(error_message)
         
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # Ctrl-C arrives as a cancellation when running under asyncio.run
             pass
+        finally:
+            redraw_task.cancel()
+            if poll_task:
+                poll_task.cancel()
+            else:
+                loop.remove_reader(stdin_fd)
         
         # Save history before exiting
-        self.session.save_history("chat_history.json")
+        await self.session.flush_history()
         
         # Restore terminal settings
         curses.echo()
         curses.curs_set(1)
+        
+        if redraw_task.done() and not redraw_task.cancelled() and redraw_task.exception() is not None:
+            raise redraw_task.exception()
+
+async def curses_wrapper(func, *args, **kwargs):
+    """Async version of curses.wrapper: run func(stdscr) and restore the terminal afterwards."""
+    try:
+        stdscr = curses.initscr()
+    except curses.error as e:
+        raise TerminalUnsupported(str(e)) from e
+    try:
+        curses.noecho()
+        curses.cbreak()
+        stdscr.keypad(1)
+        try:
+            curses.start_color()
+        except curses.error:
+            pass
+        return await func(stdscr, *args, **kwargs)
+    finally:
+        stdscr.keypad(0)
+        curses.echo()
+        curses.nocbreak()
+        curses.endwin()
 
-class HumanAgent(AIAgent):
+class HumanAgent(ConsoleHumanAgent):
     def __init__(self, name: str = "Human"):
         super().__init__(name)
         self.ui = None
@@ -259,7 +441,7 @@ class HumanAgent(AIAgent):
         """Set the UI for this agent."""
         self.ui = ui
     
-    async def process_message(self, message: Message) -> Message:
+    async def process_message(self, message: Message, on_token: Optional[Callable[[str], None]] = None) -> Message:
         """Process a message by getting input from the human via the UI."""
         if self.ui:
             user_input = await self.ui.get_user_input()
@@ -267,7 +449,7 @@ class HumanAgent(AIAgent):
         else:
             # Fallback to console input if no UI is set
             print(f"\n{message.sender}: {message.content}")
-            user_input = input(f"\n{self.name}: ")
+            user_input = await ainput(f"\n{self.name}: ")
             return Message(sender=self.name, content=user_input)
 
 async def run_terminal_ui():
@@ -275,8 +457,9 @@ async def run_terminal_ui():
     session = ChatSession()
     
     # Add agents
-    session.add_agent(GeminiAgent())
-    session.add_agent(LlamaAgent())
+    from config import API_KEYS
+    session.add_agent(GeminiAgent(api_key=API_KEYS["GEMINI_API_KEY"]))
+    session.add_agent(LlamaAgent(api_key=API_KEYS["GROQ_API_KEY"]))
     
     # Add a human agent
     human = HumanAgent()
@@ -289,7 +472,8 @@ async def run_terminal_ui():
     human.set_ui(ui)
     
     # Run the UI with curses
-    await curses.wrapper(ui.run)
+    async with session:
+        await curses_wrapper(ui.run)
 
 if __name__ == "__main__":
-    asyncio.run(run_terminal_ui())
\ No newline at end of file
+    run_event_loop(run_terminal_ui())
\ No newline at end of file
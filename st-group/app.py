@@ -1,9 +1,10 @@
 import streamlit as st
 import os
-import time
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from google.genai import types
 from groq import Groq
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Set page configuration
 st.set_page_config(
@@ -15,9 +16,13 @@ st.set_page_config(
 # Initialize session state for chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "history_tail" not in st.session_state:
+    st.session_state.history_tail = ""
+if "chat_html" not in st.session_state:
+    st.session_state.chat_html = ""
 
-if "agent_typing" not in st.session_state:
-    st.session_state.agent_typing = None
+# Maximum characters of recent history included in prompts
+HISTORY_TAIL_CHARS = 4000
 
 # Define the agents
 AGENTS = {
@@ -84,10 +89,25 @@ context = st.sidebar.text_area("Context for the AI agents",
     height=100)
 
 # Helper functions
-def get_gemini_response(prompt):
+def gemini_client():
+    """Reuse the Gemini client across reruns so its connection pool stays warm"""
+    if st.session_state.get("_gemini_key") != gemini_api_key:
+        st.session_state._gemini_client = genai.Client(api_key=gemini_api_key)
+        st.session_state._gemini_key = gemini_api_key
+    return st.session_state._gemini_client
+
+def groq_client():
+    """Reuse the Groq client across reruns so its connection pool stays warm"""
+    if st.session_state.get("_groq_key") != groq_api_key:
+        st.session_state._groq_client = Groq(api_key=groq_api_key)
+        st.session_state._groq_key = groq_api_key
+    return st.session_state._groq_client
+
+def get_gemini_response(prompt, placeholder=None):
     """Get response from Gemini model"""
+    placeholder = placeholder or streaming_placeholder
     try:
-        client = genai.Client(api_key=gemini_api_key)
+        client = gemini_client()
         model = "gemini-2.5-pro-exp-03-25"
         
         full_prompt = f"{context}\n\nYou're the Gemini AI in a group chat. Previous messages: {format_history_for_context()}\n\nUser message: {prompt}"
@@ -107,28 +127,28 @@ def get_gemini_response(prompt):
         )
         
         response_text = ""
-        st.session_state.agent_typing = "Gemini"
+        show_typing("Gemini", placeholder)
         
-        # Simulate streaming for UI
+        # Stream chunks into the live message as they arrive
         for chunk in client.models.generate_content_stream(
             model=model,
             contents=contents,
             config=generate_content_config,
         ):
             response_text += chunk.text if chunk.text else ""
-            time.sleep(0.05)  # Slight delay for visual effect
-            rerender_chat()
+            render_streaming("Gemini", response_text, placeholder)
             
-        st.session_state.agent_typing = None
+        placeholder.empty()
         return response_text
     except Exception as e:
-        st.session_state.agent_typing = None
+        placeholder.empty()
         return f"Error with Gemini: {str(e)}"
 
-def get_llama_response(prompt):
+def get_llama_response(prompt, placeholder=None):
     """Get response from Llama model via Groq"""
+    placeholder = placeholder or streaming_placeholder
     try:
-        client = Groq(api_key=groq_api_key)
+        client = groq_client()
         
         # Format chat history for Llama
         messages = [{"role": "system", "content": context}]
@@ -142,7 +162,7 @@ def get_llama_response(prompt):
         messages.append({"role": "user", "content": prompt})
         
         response_text = ""
-        st.session_state.agent_typing = "Llama"
+        show_typing("Llama", placeholder)
         
         # Get streaming response
         completion = client.chat.completions.create(
@@ -157,57 +177,54 @@ def get_llama_response(prompt):
         for chunk in completion:
             chunk_text = chunk.choices[0].delta.content or ""
             response_text += chunk_text
-            time.sleep(0.03)  # Slight delay for visual effect
-            rerender_chat()
+            render_streaming("Llama", response_text, placeholder)
             
-        st.session_state.agent_typing = None
+        placeholder.empty()
         return response_text
     except Exception as e:
-        st.session_state.agent_typing = None
+        placeholder.empty()
         return f"Error with Llama: {str(e)}"
 
 def format_history_for_context():
     """Format chat history for context"""
-    history_text = ""
-    for msg in st.session_state.messages[-10:]:  # Last 10 messages
-        history_text += f"{msg['agent']}: {msg['content']}\n"
-    return history_text
+    # Maintained incrementally by add_message
+    return st.session_state.history_tail
 
 def add_message(agent, content):
-    """Add a message to chat history"""
-    st.session_state.messages.append({"agent": agent, "content": content})
+    """Add a message to chat history, formatting its bubble HTML once"""
+    st.session_state.messages.append({
+        "agent": agent,
+        "content": content,
+        "html": message_html(agent, content)
+    })
+    # Extend the rendered transcript so reruns can emit it without touching each message
+    st.session_state.chat_html += st.session_state.messages[-1]["html"]
+    # Keep a rolling, size-capped transcript for prompts instead of rebuilding it per request
+    st.session_state.history_tail = (
+        st.session_state.history_tail + f"{agent}: {content}\n"
+    )[-HISTORY_TAIL_CHARS:]
 
 def rerender_chat():
-    """Force rerender of chat"""
-    chat_placeholder.empty()
+    """Re-render the committed chat history; called only when a message is added"""
     display_chat()
 
-# Display chat messages
-def display_chat():
-    for message in st.session_state.messages:
-        agent = message["agent"]
-        agent_info = AGENTS[agent]
-        
-        # Create message container with agent-specific styling
-        with st.container():
-            st.markdown(
-                f"""
-                <div class="chat-container" style="background-color: {agent_info['color']}25;">
-                    <div class="agent-name">{agent_info['avatar']} {agent}</div>
-                    <div>{message['content']}</div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-    
-    # Show typing indicator if an agent is typing
-    if st.session_state.agent_typing:
-        agent = st.session_state.agent_typing
-        agent_info = AGENTS[agent]
-        
-        with st.container():
-            st.markdown(
-                f"""
+def message_html(agent, content):
+    """Build the chat bubble HTML for a message"""
+    agent_info = AGENTS[agent]
+    # Unindented so bubbles can be joined: markdown treats indented lines after a blank line as code.
+    # Blank lines around the content keep its markdown (e.g. a code block) from swallowing the closing tags.
+    return (
+        f"<div class='chat-container' style='background-color: {agent_info['color']}25;'>\n"
+        f"<div class='agent-name'>{agent_info['avatar']} {agent}</div>\n"
+        f"<div>\n\n{content}\n\n</div>\n"
+        "</div>\n\n"
+    )
+
+def show_typing(agent, placeholder):
+    """Show the typing indicator for an agent until its first chunk arrives"""
+    agent_info = AGENTS[agent]
+    placeholder.markdown(
+        f"""
                 <div class="chat-container" style="background-color: {agent_info['color']}25;">
                     <div class="agent-name">{agent_info['avatar']} {agent}</div>
                     <div class="typing-indicator">
@@ -217,11 +234,37 @@ def display_chat():
                     </div>
                 </div>
                 """,
-                unsafe_allow_html=True
-            )
+        unsafe_allow_html=True
+    )
 
-# Create a placeholder for the chat messages
+def render_streaming(agent, text, placeholder):
+    """Show a partially streamed response without re-rendering the chat history"""
+    placeholder.markdown(message_html(agent, f"{text}▍"), unsafe_allow_html=True)
+
+def get_all_responses(prompt):
+    """Stream Gemini and Llama concurrently, each into its own live placeholder"""
+    with streaming_placeholder.container():
+        gemini_placeholder = st.empty()
+        llama_placeholder = st.empty()
+
+    # Worker threads need the script run context to touch session state and placeholders
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=2, initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        gemini_future = executor.submit(get_gemini_response, prompt, gemini_placeholder)
+        llama_future = executor.submit(get_llama_response, prompt, llama_placeholder)
+        responses = gemini_future.result(), llama_future.result()
+
+    streaming_placeholder.empty()
+    return responses
+
+# Display chat messages
+def display_chat():
+    # The transcript HTML is extended in add_message, so unrelated reruns do no per-message work
+    chat_placeholder.markdown(st.session_state.chat_html, unsafe_allow_html=True)
+
+# Placeholders for the committed chat history and the response currently being streamed
 chat_placeholder = st.empty()
+streaming_placeholder = st.empty()
 display_chat()
 
 # User input
@@ -237,13 +280,9 @@ with col1:
             add_message("You", user_input)
             rerender_chat()
             
-            # Get Gemini response
-            gemini_response = get_gemini_response(user_input)
+            # Get both responses concurrently
+            gemini_response, llama_response = get_all_responses(user_input)
             add_message("Gemini", gemini_response)
-            rerender_chat()
-            
-            # Get Llama response
-            llama_response = get_llama_response(user_input)
             add_message("Llama", llama_response)
             rerender_chat()
             
@@ -283,6 +322,8 @@ with col3:
 # Clear chat button
 if st.button("Clear Chat"):
     st.session_state.messages = []
+    st.session_state.history_tail = ""
+    st.session_state.chat_html = ""
     rerender_chat()
 
 # Display API key warnings if not provided